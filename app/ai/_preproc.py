@@ -0,0 +1,78 @@
+import logging
+from functools import lru_cache
+from itertools import filterfalse
+from typing import FrozenSet, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# --- Shared Preprocessing Logic (used by trainer.py and validator.py; the trained model depends on it) ---
+def _get_english_stopwords():
+    """Ensures stopwords are downloaded and returns the set."""
+    import nltk # Deferred: workers that never preprocess text don't pay for nltk
+    from nltk.corpus import stopwords
+    try:
+        sw = set(stopwords.words('english'))
+    except LookupError:
+        try:
+            nltk.data.find('corpora/stopwords.zip')
+        except LookupError:
+            logger.warning("[PREPROC] NLTK stopwords package not found. Attempting download of 'stopwords' package.")
+            nltk.download('stopwords', quiet=True)
+        except Exception as e:
+            logger.error(f"[PREPROC] NLTK data path issue for stopwords: {e}. Ensure NLTK data is correctly installed/accessible.")
+            raise
+        sw = set(stopwords.words('english'))
+    return sw
+
+@lru_cache(maxsize=None)
+def get_english_stopwords() -> FrozenSet[str]:
+    """Loads the stopword set on first use and keeps it for the life of the process."""
+    return frozenset(_get_english_stopwords())
+
+def __getattr__(name: str):
+    # ENGLISH_STOPWORDS_SET stays importable but is only materialized when accessed.
+    if name == "ENGLISH_STOPWORDS_SET":
+        return get_english_stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Keep alphanumeric, spaces, and potentially useful symbols for tech content
+_KEPT_SYMBOLS = frozenset('.()+-*/=<>%_')
+
+class _CleanTable(dict):
+    """str.translate table deleting every char outside [\\w\\s.()+\\-*/=<>%]; filled lazily per code point."""
+    def __missing__(self, codepoint: int):
+        ch = chr(codepoint)
+        # Same classes the re module uses for \\w and \\s on str patterns.
+        result = codepoint if (ch.isalnum() or ch.isspace() or ch in _KEPT_SYMBOLS) else None
+        if codepoint < 0x10000: self[codepoint] = result # Bound the table to the BMP
+        return result
+
+_CLEAN_TABLE = _CleanTable()
+
+def common_preprocess_text(text: str) -> str:
+    if not isinstance(text, str):
+        return ""
+
+    text = text.lower().translate(_CLEAN_TABLE)
+    # Numbers are KEPT by default in this version.
+    # To remove numbers, uncomment the next line (and `import re`) and test its impact:
+    # text = re.sub(r'\d+', ' <NUM_TOKEN> ', text) # Replace numbers with a token, add spaces around token
+    # text = re.sub(r'\s+', ' ', text).strip() # Clean up extra spaces if using <NUM_TOKEN>
+
+    # Remove stopwords. Allow single characters as they might be part of technical terms now.
+    return " ".join(filterfalse(get_english_stopwords().__contains__, text.split()))
+
+_ROW_SEP = '\x1e' # Whitespace to split()/\s, so it survives cleaning and can never end up inside a token.
+
+def common_preprocess_batch(texts: Sequence[str]) -> List[str]:
+    """common_preprocess_text over many texts; lowercasing and cleaning run as one pass over the joined corpus."""
+    rows = ['' if not isinstance(t, str) else t for t in texts]
+    if not rows:
+        return []
+    corpus = _ROW_SEP.join(rows)
+    if corpus.count(_ROW_SEP) != len(rows) - 1: # A row contains the separator itself; neutralize it first.
+        corpus = _ROW_SEP.join(r.replace(_ROW_SEP, ' ') for r in rows)
+    corpus = corpus.lower().translate(_CLEAN_TABLE)
+    is_stopword = get_english_stopwords().__contains__ # C-level predicate for filterfalse
+    return [" ".join(filterfalse(is_stopword, row.split())) for row in corpus.split(_ROW_SEP)]
+# --- End of Shared Preprocessing Logic ---
@@ -10,61 +10,42 @@ if PROJECT_ROOT not in sys.path:
 
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 import joblib
 import logging
-import nltk 
-from nltk.corpus import stopwords 
-import re 
+from app.ai._preproc import common_preprocess_batch
 
 logger = logging.getLogger(__name__)
 # Configure logging for this script if it's run directly
 if __name__ == "__main__": 
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-# --- Preprocessing Logic (Inlined - Keep Identical in validator.py) ---
-def _get_english_stopwords():
-    """Ensures stopwords are downloaded and returns the set."""
-    try:
-        sw = set(stopwords.words('english'))
-    except LookupError: 
-        try:
-            nltk.data.find('corpora/stopwords.zip') 
-        except nltk.downloader.DownloadError: 
-            logger.warning("[TRAINER] NLTK stopwords package not found. Attempting download of 'stopwords' package.")
-            nltk.download('stopwords', quiet=True)
-        except Exception as e: 
-            logger.error(f"[TRAINER] NLTK data path issue for stopwords: {e}. Ensure NLTK data is correctly installed/accessible.")
-            raise 
-        sw = set(stopwords.words('english')) 
-    return sw
-
-ENGLISH_STOPWORDS_SET = _get_english_stopwords()
-
-def common_preprocess_text(text: str) -> str:
-    if not isinstance(text, str):
-        return ""
-    
-    text = text.lower()
-    # Keep alphanumeric, spaces, and potentially useful symbols for tech content
-    text = re.sub(r'[^\w\s\.\(\)\+\-\*/\=\<\>\%]', '', text) 
-    # Numbers are KEPT by default in this version. 
-    # To remove numbers, uncomment the next line and test its impact:
-    # text = re.sub(r'\d+', ' <NUM_TOKEN> ', text) # Replace numbers with a token, add spaces around token
-    # text = re.sub(r'\s+', ' ', text).strip() # Clean up extra spaces if using <NUM_TOKEN>
-    
-    words = text.split()
-    # Remove stopwords. Allow single characters as they might be part of technical terms now.
-    processed_words = [w for w in words if w not in ENGLISH_STOPWORDS_SET and len(w) > 0]
-            
-    return " ".join(processed_words)
-# --- End of Inlined Preprocessing Logic ---
+# --- Batched Preprocessing (training only; output identical to common_preprocess_text per row) ---
+def _preprocess_batch(s: pd.Series) -> pd.Series:
+    return pd.Series(common_preprocess_batch(s.tolist()), index=s.index, dtype=object)
+
+# Serial preprocessing runs at roughly 2us/row, while starting loky workers (each re-importing this module) takes seconds.
+_PARALLEL_MIN_ROWS = 1000000
+
+def common_preprocess_series(s: pd.Series, n_jobs: int = 1) -> pd.Series:
+    """Row-wise common_preprocess_text over a Series; large inputs are split into chunks across n_jobs processes."""
+    n_workers = joblib.effective_n_jobs(n_jobs)
+    if n_workers <= 1 or len(s) < _PARALLEL_MIN_ROWS: return _preprocess_batch(s)
+    # Processes, not threads: str.translate/split hold the GIL.
+    chunk_size = -(-len(s) // n_workers)
+    chunks = [s.iloc[i:i + chunk_size] for i in range(0, len(s), chunk_size)]
+    return pd.concat(joblib.Parallel(n_jobs=n_workers)(joblib.delayed(_preprocess_batch)(c) for c in chunks))
+# --- End of Batched Preprocessing ---
+
+# Width of the hashed feature space. idf_ and coef_ are dense over it, so it sets the pickle size; 2**12 keeps the
+# model ~67KB (2**14 was ~264KB) with the same held-out accuracy on the bundled data. Raise it as the corpus grows.
+HASH_N_FEATURES = 2 ** 12
 
 
-def train_help_post_model(config_model_version: str = "1.0.0"):
+def train_help_post_model(config_model_version: str = "1.0.0", n_jobs: int = -1):
     logger.info("="*40); logger.info(" Starting help_post model training ".center(40, "=")); logger.info("="*40)
     data_file_path = os.path.join(PROJECT_ROOT, 'data', 'help_post_training_data.csv')
     model_output_dir = os.path.join(PROJECT_ROOT, 'data', 'trained_models'); os.makedirs(model_output_dir, exist_ok=True)
@@ -86,8 +67,8 @@ def train_help_post_model(config_model_version: str = "1.0.0"):
     if df.shape[0] < 20: logger.error(f"Not enough valid data points (need >= 20). Found: {df.shape[0]}"); return
     logger.info(f"Label distribution after cleaning:\n{df['label'].value_counts(normalize=True)}")
 
-    logger.info("Preprocessing text data using INLINED common_preprocess_text...")
-    df['processed_content'] = df['content'].apply(common_preprocess_text)
+    logger.info("Preprocessing text data using batched common_preprocess_series...")
+    df['processed_content'] = common_preprocess_series(df['content'], n_jobs=n_jobs)
     if (df['processed_content'].str.strip() == '').sum() > 0: logger.warning(f"{(df['processed_content'].str.strip() == '').sum()} entries became empty after processing.")
 
     X = df['processed_content']; y = df['label']
@@ -108,8 +89,10 @@ def train_help_post_model(config_model_version: str = "1.0.0"):
     if len(y_test) > 0: logger.info(f"Test Labels:\n{y_test.value_counts(normalize=True, dropna=False)}")
 
     pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(max_features=5000, ngram_range=(1, 2), min_df=2, max_df=0.95, stop_words=None)), # min_df=2, max_df=0.95 are good defaults
-        ('clf', LogisticRegression(solver='liblinear', random_state=42, class_weight='balanced', C=2.0))]) # C=2.0 for less regularization
+        # Stateless hashing instead of a fitted vocabulary: fixed-size feature space, no vocab dict in the pickle.
+        ('hash', HashingVectorizer(n_features=HASH_N_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm=None)),
+        ('tfidf', TfidfTransformer(sublinear_tf=True)),
+        ('clf', LogisticRegression(solver='saga', max_iter=2000, random_state=42, class_weight='balanced', C=2.0))]) # C=2.0 for less regularization; saga works on the sparse TF-IDF matrix directly
 
     logger.info("Training model..."); pipeline.fit(X_train, y_train)
 
@@ -121,13 +104,17 @@ def train_help_post_model(config_model_version: str = "1.0.0"):
         target_names = [f'Class {c}' for c in clf_classes]
         if sorted(clf_classes) == [0,1]: target_names = [('Class 0 (Bad)' if c==0 else 'Class 1 (Good)') for c in clf_classes]
         logger.info("Classification Report:\n" + classification_report(y_test, y_pred, target_names=target_names, zero_division=0))
-        try:
-            coefs = pipeline.named_steps['clf'].coef_[0]
-            feats = pipeline.named_steps['tfidf'].get_feature_names_out()
-            coef_df = pd.DataFrame({'feature': feats, 'coefficient': coefs}).sort_values(by='coefficient', ascending=False)
-            logger.info("Top Positive Features:\n" + str(coef_df.head(20)))
-            logger.info("Top Negative Features:\n" + str(coef_df.tail(20).sort_values(by='coefficient')))
-        except Exception as e: logger.warning(f"Coef display error: {e}")
+        vocab_step = next((step for step in pipeline[:-1] if hasattr(step, 'vocabulary_')), None)
+        if vocab_step is None:
+            logger.info("Hashed features have no inverse mapping; skipping top-feature display.")
+        else:
+            try:
+                coefs = pipeline.named_steps['clf'].coef_[0]
+                feats = vocab_step.get_feature_names_out()
+                coef_df = pd.DataFrame({'feature': feats, 'coefficient': coefs}).sort_values(by='coefficient', ascending=False)
+                logger.info("Top Positive Features:\n" + str(coef_df.head(20)))
+                logger.info("Top Negative Features:\n" + str(coef_df.tail(20).sort_values(by='coefficient')))
+            except Exception as e: logger.warning(f"Coef display error: {e}")
         if not X_test[y_test == 1].empty: logger.info(f"Sample GOOD (processed): '{X_test[y_test == 1].iloc[0][:100]}...' -> Probs: {pipeline.predict_proba([X_test[y_test == 1].iloc[0]])[0]}")
         if not X_test[y_test == 0].empty: logger.info(f"Sample BAD (processed): '{X_test[y_test == 0].iloc[0][:100]}...' -> Probs: {pipeline.predict_proba([X_test[y_test == 0].iloc[0]])[0]}")
     else: logger.warning("Test set empty or unusable for full evaluation.")
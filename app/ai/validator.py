@@ -1,39 +1,35 @@
-import joblib
+import math
 import os
 import logging
-import nltk 
-from nltk.corpus import stopwords 
-import re 
-from typing import Tuple, Optional # <<<--- IMPORT Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Tuple, Optional # <<<--- IMPORT Optional
 
 from app.core.config import AppConfig 
+from app.ai._preproc import common_preprocess_text, get_english_stopwords
+
+if TYPE_CHECKING: import numpy as np # Imported at load time only; workers with AI validation disabled never load numpy
 
 logger = logging.getLogger(__name__)
 
-# --- Preprocessing Logic (Inlined - Keep Identical in trainer.py) ---
-def _get_english_stopwords():
-    try:
-        sw = set(stopwords.words('english'))
-    except LookupError: 
-        try: nltk.data.find('corpora/stopwords.zip')
-        except nltk.downloader.DownloadError: logger.warning("[VALIDATOR] NLTK stopwords pkg not found. Downloading."); nltk.download('stopwords', quiet=True)
-        except Exception as e: logger.error(f"[VALIDATOR] NLTK stopwords path issue: {e}"); raise
-        sw = set(stopwords.words('english')) 
-    return sw
-
-ENGLISH_STOPWORDS_SET = _get_english_stopwords()
-
-def common_preprocess_text(text: str) -> str: 
-    if not isinstance(text, str): return ""
-    text = text.lower()
-    text = re.sub(r'[^\w\s\.\(\)\+\-\*/\=\<\>\%]', '', text)
-    words = text.split()
-    processed_words = [w for w in words if w not in ENGLISH_STOPWORDS_SET and len(w) > 0]
-    return " ".join(processed_words)
-# --- End of Inlined Preprocessing Logic ---
+def _quantize_coef(coef: "np.ndarray") -> Tuple["np.ndarray", float]:
+    """Symmetric per-vector int16 quantization; returns (quantized, scale) with coef ~= quantized / scale.
+    int16 keeps probabilities within ~1e-4 of the float model; int8 was measured at ~7e-3 and can shift borderline posts."""
+    import numpy as np
+    max_abs = float(np.max(np.abs(coef))) if coef.size else 0.0
+    scale = 32767.0 / max_abs if max_abs > 0 else 1.0
+    return np.round(coef * scale).astype(np.int16), scale
 
 class ContentValidator:
     _model_pipeline = None; _loaded_model_version = None; _model_base_path = None
+    _model_classes = None; _class_1_index = None # Derived from the pipeline once per load
+    _vectorizer = None; _classifier = None # Pipeline split so the sparse TF-IDF row goes straight to the classifier
+    _coef = None; _coef_scale = None; _intercept = None # Binary linear classifier weights (int16 + scale) for the hand-rolled sigmoid path
+    # LRU of blake2b(processed_text) -> (predicted_class, prob_class_1); duplicate posts/retries skip inference.
+    _prediction_cache: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+    _prediction_cache_size = 4096
+    _prediction_cache_lock = threading.Lock()
 
     @classmethod
     def _initialize_paths(cls):
@@ -53,60 +49,99 @@ class ContentValidator:
         model_path = os.path.join(cls._model_base_path, f'help_post_classifier_v{model_ver}.pkl')
         if not os.path.exists(model_path): raise FileNotFoundError(f"AI Model not found: {model_path}")
         try:
-            cls._model_pipeline = joblib.load(model_path); cls._loaded_model_version = model_ver
+            get_english_stopwords() # Preprocessing needs the nltk corpus; a missing one fails the load (and startup), not each help_post
+            import joblib # Deferred with scikit-learn (pulled in by unpickling) until a model is actually needed
+            import scipy.sparse as sp
+            pipeline = joblib.load(model_path)
+            vectorizer = pipeline[:-1]; classifier = pipeline[-1]
+            emits_sparse = sp.issparse(vectorizer.transform([""]))
+            if not emits_sparse: logger.warning("AI model vectorizer does not emit sparse output; inference will run on dense rows.")
+            coef = coef_scale = intercept = None
+            clf_coef = getattr(classifier, "coef_", None)
+            if emits_sparse and clf_coef is not None and clf_coef.shape[0] == 1 and hasattr(classifier, "intercept_"):
+                coef, coef_scale = _quantize_coef(clf_coef[0]); intercept = float(classifier.intercept_[0])
+            model_classes = list(pipeline.classes_)
+            # Derived state is published first and _model_pipeline last: callers treat a non-None pipeline as "ready" without taking a lock.
+            cls._vectorizer = vectorizer; cls._classifier = classifier
+            cls._coef = coef; cls._coef_scale = coef_scale; cls._intercept = intercept
+            cls._model_classes = model_classes; cls._class_1_index = model_classes.index(1) if 1 in model_classes else None
+            cls._clear_prediction_cache()
+            cls._loaded_model_version = model_ver; cls._model_pipeline = pipeline
             logger.info(f"Help post model v{model_ver} loaded from {model_path}")
         except Exception as e: logger.error(f"Error loading AI model: {e}", exc_info=True); cls._model_pipeline = None; raise
 
+    @classmethod
+    def _clear_prediction_cache(cls):
+        with cls._prediction_cache_lock: cls._prediction_cache.clear()
+
+    @classmethod
+    def _get_cached_prediction(cls, key: bytes) -> Optional[Tuple[int, float]]:
+        with cls._prediction_cache_lock:
+            cached = cls._prediction_cache.get(key)
+            if cached is not None: cls._prediction_cache.move_to_end(key)
+            return cached
 
     @classmethod
-    def validate_content(cls, content_text: str) -> Tuple[bool, str, Optional[float]]: # <<<--- CHANGED HERE
+    def _store_prediction(cls, key: bytes, prediction: Tuple[int, float]):
+        with cls._prediction_cache_lock:
+            cls._prediction_cache[key] = prediction
+            if len(cls._prediction_cache) > cls._prediction_cache_size: cls._prediction_cache.popitem(last=False)
+
+    @classmethod
+    def _predict(cls, processed_text: str) -> Tuple[int, float]:
+        """Returns (predicted class, probability of class 1) for one preprocessed text."""
+        features = cls._vectorizer.transform([processed_text]) # 1 x n_features CSR row
+        if cls._coef is None:
+            # predict() is argmax(predict_proba()), so one forward pass gives both.
+            probabilities = cls._classifier.predict_proba(features)[0]
+            return cls._model_classes[int(probabilities.argmax())], float(probabilities[cls._class_1_index])
+        # Binary logistic regression: P(classes_[1]) = sigmoid(x . coef + intercept), summed over the row's non-zeros only.
+        logit = float(features.data.dot(cls._coef[features.indices])) / cls._coef_scale + cls._intercept
+        prob_positive = 1.0 / (1.0 + math.exp(-logit)) if logit >= 0 else math.exp(logit) / (1.0 + math.exp(logit))
+        prediction_result = cls._model_classes[1] if logit > 0 else cls._model_classes[0]
+        return prediction_result, (prob_positive if cls._class_1_index == 1 else 1.0 - prob_positive)
+
+    @classmethod
+    def validate_content(cls, content_text: str) -> Tuple[bool, str, Optional[float], Optional[str]]:
+        """Returns (is_valid, message, prob_good, error_code); error_code is None when valid, "ai_rejected" for the
+        content itself, and "ai_unavailable"/"ai_error" when the service failed to judge it."""
         if not cls._model_pipeline: 
             logger.error("AI model pipeline is not loaded. Cannot validate content.")
-            return False, "AI model not available for validation.", None
+            return False, "AI model not available for validation.", None, "ai_unavailable"
 
-        original_text_for_log = content_text[:200] 
         processed_text = common_preprocess_text(content_text) 
-        
-        logger.info(f"--- AI VALIDATION DIAGNOSTICS (validator.py) ---")
-        logger.info(f"Original Input Snippet: '{original_text_for_log}...'")
-        logger.info(f"Processed Text for Model: '{processed_text[:200]}...'")
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug("AI validation input snippet: '%s...' | processed for model: '%s...'", content_text[:200], processed_text[:200])
 
         if not processed_text.strip():
-            logger.info("Content became empty after preprocessing.")
-            logger.info(f"--- END AI VALIDATION DIAGNOSTICS ---")
-            return False, "Content is empty or contains only stopwords/punctuation after processing.", None
+            logger.info("AI validation: content became empty after preprocessing.")
+            return False, "Content is empty or contains only stopwords/punctuation after processing.", None, "ai_rejected"
 
         try:
-            prediction_result = cls._model_pipeline.predict([processed_text])[0] 
-            probabilities = cls._model_pipeline.predict_proba([processed_text])[0] 
-            
-            model_classes = list(cls._model_pipeline.classes_) 
-            class_1_index = -1
-            try:
-                class_1_index = model_classes.index(1) 
-            except ValueError:
-                 logger.error(f"Critical: Class '1' (good) not found in model's learned classes: {model_classes}")
-                 logger.info(f"--- END AI VALIDATION DIAGNOSTICS ---")
-                 return False, "AI model configuration error (class labels).", None
-
-            confidence_for_class_1 = float(probabilities[class_1_index]) 
-            
-            logger.info(f"Model's Learned Classes: {model_classes}")
-            logger.info(f"Raw Prediction (0 or 1): {prediction_result}")
-            logger.info(f"Probabilities array (corresponds to classes {model_classes}): {probabilities}")
-            logger.info(f"Calculated Probability for Class 1 (Good): {confidence_for_class_1:.4f}")
+            class_1_index = cls._class_1_index
+            if class_1_index is None:
+                 logger.error("Critical: Class '1' (good) not found in model's learned classes: %s", cls._model_classes)
+                 return False, "AI model configuration error (class labels).", None, "ai_error"
+
+            cache_key = hashlib.blake2b(processed_text.encode('utf-8'), digest_size=16).digest()
+            cached_prediction = cls._get_cached_prediction(cache_key)
+            if cached_prediction is None:
+                prediction_result, confidence_for_class_1 = cls._predict(processed_text)
+                cls._store_prediction(cache_key, (prediction_result, confidence_for_class_1))
+            else:
+                prediction_result, confidence_for_class_1 = cached_prediction
+            if debug_enabled:
+                logger.debug("AI validation model classes: %s, raw prediction: %s, from cache: %s", cls._model_classes, prediction_result, cached_prediction is not None)
             
             is_final_valid_prediction = bool(prediction_result == 1)
-
-            logger.info(f"Final Decision (is_valid_prediction): {is_final_valid_prediction}")
-            logger.info(f"--- END AI VALIDATION DIAGNOSTICS ---")
+            logger.info("AI validation decision: valid=%s prob_good=%.4f", is_final_valid_prediction, confidence_for_class_1)
 
             if is_final_valid_prediction:
-                return True, f"Content classified as valid by AI (Prob_Good: {confidence_for_class_1:.2f})", confidence_for_class_1
+                return True, f"Content classified as valid by AI (Prob_Good: {confidence_for_class_1:.2f})", confidence_for_class_1, None
             else:
                 rejection_msg = f"Content classified as low quality/irrelevant by AI (Prob_Good: {confidence_for_class_1:.2f})"
-                return False, rejection_msg, confidence_for_class_1
+                return False, rejection_msg, confidence_for_class_1, "ai_rejected"
         except Exception as e: 
-            logger.error(f"ERROR during AI content validation: {e}", exc_info=True)
-            logger.info(f"--- END AI VALIDATION DIAGNOSTICS (ERROR) ---")
-            return False, "An error occurred during AI validation.", None
\ No newline at end of file
+            logger.error("ERROR during AI content validation: %s", e, exc_info=True)
+            return False, "An error occurred during AI validation.", None, "ai_error"
\ No newline at end of file
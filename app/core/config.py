@@ -5,10 +5,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def _flatten(data: Any, prefix: str = "", out: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Maps every reachable dotted key path (intermediate dicts included) to its value."""
+    if out is None: out = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if not isinstance(key, str) or "." in key: continue # Not addressable by a dotted path
+            path = f"{prefix}.{key}" if prefix else key
+            out[path] = value
+            _flatten(value, path, out)
+    return out
+
 class AppConfig:
     _config_data: Dict[str, Any] = {}
     _config_path: Optional[str] = None
     _loaded: bool = False # Flag to see if it has attempted loading
+    _flat: Dict[str, Any] = {} # Dotted key_path -> value, rebuilt on every successful load
 
     @classmethod
     def load_config(cls, config_file_path: Optional[str] = None):
@@ -39,6 +51,7 @@ class AppConfig:
         try:
             with open(actual_config_path, 'r') as f:
                 cls._config_data = json.load(f)
+            cls._flat = _flatten(cls._config_data)
             cls._loaded = True # Mark as loaded successfully
             logger.info(f"Configuration loaded successfully from {actual_config_path}")
         except json.JSONDecodeError as e:
@@ -60,15 +73,7 @@ class AppConfig:
              logger.warning(f"AppConfig.get('{key_path}'): Config data is empty (load might have failed). Returning default.")
              return default_value
 
-        keys = key_path.split('.')
-        current_level_data = cls._config_data
-        for key_part in keys:
-            if isinstance(current_level_data, dict) and key_part in current_level_data:
-                current_level_data = current_level_data[key_part]
-            else:
-                # logger.debug(f"Key part '{key_part}' not found in path '{key_path}'. Returning default: {default_value}")
-                return default_value
-        return current_level_data
+        return cls._flat.get(key_path, default_value)
 
 # Attempt to load config when this module is imported.
 # This makes it available early. Errors during this load will be raised.
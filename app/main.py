@@ -1,7 +1,9 @@
 # This program was developed with help from Cursor AI and Google AI Studio.
 import logging
+import fastapi
 from fastapi import FastAPI, HTTPException, Request 
 from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager 
 
 logging.basicConfig(
@@ -12,13 +14,26 @@ logger = logging.getLogger(__name__)
 
 try:
     from app.core.config import AppConfig
-    from app.models.streaks_models import StreakUpdateRequest, StreakUpdateResponse 
+    from app.models.streaks_models import StreakUpdateRequest, StreakUpdateResponse, HealthStatus, VersionInfo
     from app.services.streak_logic import StreakCalculatorService # Assumes this expects uid, event_dt_utc, actions_load
     from app.ai.validator import ContentValidator
 except ImportError as e:
     logger.error(f"CRITICAL IMPORT ERROR in main.py: {e}. Check PYTHONPATH and file structure.", exc_info=True)
     raise 
 
+ROOT_HTML_VERSION_FALLBACK = "N/A - Error loading version"
+ROOT_HTML_TEMPLATE = """
+        <html><head><title>Streak Scoring Microservice</title><style>body{{font-family:Arial,sans-serif;margin:40px;line-height:1.6;background-color:#f8f9fa;color:#212529;}}.container{{max-width:800px;margin:auto;padding:30px;border:1px solid #dee2e6;border-radius:8px;background-color:#fff;box-shadow:0 4px 8px rgba(0,0,0,0.1);}}h1{{color:#007bff;border-bottom:2px solid #007bff;padding-bottom:10px;}}ul{{list-style-type:none;padding-left:0;}}li{{margin-bottom:8px;background-color:#e9ecef;padding:10px;border-radius:4px;}}a{{color:#0056b3;text-decoration:none;font-weight:bold;}}a:hover{{text-decoration:underline;color:#003875;}}.footer-note{{font-size:0.9em;color:#7f8c8d;margin-top:30px;}}</style></head>
+        <body><div class="container"><h1>Welcome to the Streak Scoring Microservice!</h1><p>This API tracks and validates user engagement streaks.</p><h2>Explore:</h2><ul>
+        <li><a href="/docs">API Documentation (Swagger UI)</a></li><li><a href="/redoc">API Documentation (ReDoc)</a></li>
+        <li><a href="/health">Health Check</a></li><li><a href="/version">Version Info</a></li></ul>
+        <p class="footer-note">Service Version: {service_version}</p></div></body></html>
+        """
+
+def render_root_html(service_version: str) -> bytes:
+    """Renders the landing page once; only the service version varies, and it only changes on config reload."""
+    return ROOT_HTML_TEMPLATE.format(service_version=service_version).encode("utf-8")
+
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI): 
     logger.info("Application startup sequence initiated (lifespan)...")
@@ -34,6 +49,7 @@ async def lifespan(app_instance: FastAPI):
         else:
             logger.info("AI model for help_post is not configured or not enabled for AI validation in config.")
         app_instance.state.streak_service = StreakCalculatorService() 
+        app_instance.state.root_html_bytes = render_root_html(AppConfig.get("service_version", ROOT_HTML_VERSION_FALLBACK))
         logger.info("StreakCalculatorService initialized and stored in app.state.streak_service.")
         logger.info("Application startup complete (lifespan).")
     except FileNotFoundError as e:
@@ -45,6 +61,7 @@ async def lifespan(app_instance: FastAPI):
     yield 
     logger.info("Application shutdown sequence initiated (lifespan)...")
     if hasattr(app_instance.state, 'streak_service'): del app_instance.state.streak_service
+    if hasattr(app_instance.state, 'root_html_bytes'): del app_instance.state.root_html_bytes
     logger.info("Application shutdown complete (lifespan).")
 
 try:
@@ -54,6 +71,14 @@ except Exception as e:
     logger.error(f"Failed to load AppConfig or get service_version for FastAPI app definition: {e}. Using default.")
     SERVICE_VERSION_FOR_APP_DEF = "0.0.0-critical-config-error"
 
+# FastAPI >= 0.130 serializes response models straight to JSON bytes in pydantic-core; setting a default response
+# class would opt out of that. Older releases (0.128 is the newest that installs on the python:3.9 image) encode to a
+# dict and json.dumps it, so there orjson renders the body instead.
+_app_kwargs = {}
+if tuple(int(p) for p in fastapi.__version__.split(".")[:2]) < (0, 130):
+    from fastapi.responses import ORJSONResponse
+    _app_kwargs["default_response_class"] = ORJSONResponse
+
 app = FastAPI(
     title="Streak Scoring Microservice",
     description="Tracks and validates user engagement streaks.",
@@ -62,27 +87,17 @@ app = FastAPI(
         {"name": "General", "description": "General service information and status"},
         {"name": "Streaks", "description": "Operations related to user streaks."},
     ],
-    lifespan=lifespan 
+    lifespan=lifespan,
+    **_app_kwargs
 )
 
 @app.get("/", tags=["General"], response_class=HTMLResponse)
-async def read_root_html():
-    logger.info("--- ENTERING read_root_html ---")
-    try:
-        current_service_version = AppConfig.get("service_version", "N/A - Error loading version") 
-        logger.info(f"read_root_html: Fetched service version: {current_service_version}")
-        html_content = f"""
-        <html><head><title>Streak Scoring Microservice</title><style>body{{font-family:Arial,sans-serif;margin:40px;line-height:1.6;background-color:#f8f9fa;color:#212529;}}.container{{max-width:800px;margin:auto;padding:30px;border:1px solid #dee2e6;border-radius:8px;background-color:#fff;box-shadow:0 4px 8px rgba(0,0,0,0.1);}}h1{{color:#007bff;border-bottom:2px solid #007bff;padding-bottom:10px;}}ul{{list-style-type:none;padding-left:0;}}li{{margin-bottom:8px;background-color:#e9ecef;padding:10px;border-radius:4px;}}a{{color:#0056b3;text-decoration:none;font-weight:bold;}}a:hover{{text-decoration:underline;color:#003875;}}.footer-note{{font-size:0.9em;color:#7f8c8d;margin-top:30px;}}</style></head>
-        <body><div class="container"><h1>Welcome to the Streak Scoring Microservice!</h1><p>This API tracks and validates user engagement streaks.</p><h2>Explore:</h2><ul>
-        <li><a href="/docs">API Documentation (Swagger UI)</a></li><li><a href="/redoc">API Documentation (ReDoc)</a></li>
-        <li><a href="/health">Health Check</a></li><li><a href="/version">Version Info</a></li></ul>
-        <p class="footer-note">Service Version: {current_service_version}</p></div></body></html>
-        """
-        logger.info("--- EXITING read_root_html successfully ---")
-        return HTMLResponse(content=html_content, status_code=200)
-    except Exception as e:
-        logger.error(f"--- ERROR in read_root_html: {e} ---", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error generating root page: {str(e)}")
+async def read_root_html(http_request: Request):
+    root_html = getattr(http_request.app.state, 'root_html_bytes', None)
+    if root_html is None: # Lifespan has not run, so nothing was prerendered
+        logger.warning("read_root_html: root page not prerendered at startup; rendering on demand.")
+        root_html = render_root_html(AppConfig.get("service_version", ROOT_HTML_VERSION_FALLBACK))
+    return HTMLResponse(content=root_html)
 
 @app.post("/streaks/update", response_model=StreakUpdateResponse, tags=["Streaks"])
 async def update_user_streaks_endpoint(request_payload: StreakUpdateRequest, http_request: Request): 
@@ -97,10 +112,12 @@ async def update_user_streaks_endpoint(request_payload: StreakUpdateRequest, htt
         raise HTTPException(status_code=503, detail="Service component type mismatch. Check server startup logs.")
     try:
         logger.info(f"Processing /streaks/update for user_id: {request_payload.user_id}")
-        actions_list_of_dicts = [action.model_dump() for action in request_payload.actions]
+        actions_list_of_dicts = request_payload.model_dump(include={'actions'})['actions'] # One serializer pass for the whole list
         
         # +++ THIS IS THE CORRECTED CALL +++
-        streaks_summary = streak_service.process_user_actions(
+        # Synchronous work (incl. help_post AI inference) runs in the threadpool so the event loop stays free.
+        streaks_summary = await run_in_threadpool(
+            streak_service.process_user_actions,
             uid=request_payload.user_id,                 # Changed to 'uid'
             event_dt_utc=request_payload.date_utc,      # Changed to 'event_dt_utc'
             actions_load=actions_list_of_dicts      # Changed to 'actions_load'
@@ -113,12 +130,12 @@ async def update_user_streaks_endpoint(request_payload: StreakUpdateRequest, htt
         logger.error(f"Error during /streaks/update for user {request_payload.user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error during streak update.")
 
-@app.get("/health", tags=["Status"])
+@app.get("/health", response_model=HealthStatus, tags=["Status"])
 async def health_check_endpoint():
     logger.debug("Health check called.")
     return {"status": "ok"}
 
-@app.get("/version", tags=["Status"])
+@app.get("/version", response_model=VersionInfo, response_model_exclude_none=True, tags=["Status"])
 async def get_version_info_endpoint():
     logger.debug("Version endpoint called.")
     try:
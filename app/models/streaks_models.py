@@ -40,7 +40,18 @@ class StreakInfo(BaseModel):
     next_deadline_utc: Optional[datetime] = None # Already uses Optional
     validated: Optional[bool] = None 
     rejection_reason: Optional[str] = None
+    error_code: Optional[str] = None # Machine-readable rejection: quiz_score_too_low, quiz_time_exceeded, word_count_too_low, ai_rejected, ai_unavailable, ai_error
 
 class StreakUpdateResponse(BaseModel):
     user_id: str
-    streaks: Dict[str, StreakInfo] 
\ No newline at end of file
+    streaks: Dict[str, StreakInfo] 
+
+# --- Service Info Models ---
+class HealthStatus(BaseModel):
+    status: str
+
+class VersionInfo(BaseModel):
+    service_name: str
+    service_api_version: str
+    ai_model_versions: Dict[str, Any]
+    error_details: Optional[str] = None # Only present when version info could not be read
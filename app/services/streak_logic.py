@@ -1,191 +1,265 @@
+from bisect import bisect_right
+from calendar import timegm
 from datetime import datetime, timedelta, timezone, date as DateObject
-from typing import Dict, Any, List, Tuple, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, NamedTuple, Tuple, Optional
 from app.core.config import AppConfig
 from app.models.streaks_models import StreakInfo
 from app.ai.validator import ContentValidator
 
 import logging
+import threading
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-FAILING_TEST_USER_ID_FOR_LOGGING = "user_timeout_tests_report_lost" 
-
-# Initialize ContentValidator
-try:
-    ContentValidator.load_model()
-    logger.info("ContentValidator initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize ContentValidator: {e}")
-
-user_streaks_db: Dict[str, Dict[str, Dict[str, Any]]] = {}
-
-def get_utc_date(dt: datetime) -> DateObject: # Line 30
-    if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc).date() # Line 31 (Corrected)
-
-def calculate_strict_deadline_for_next_day_action(action_date_event: DateObject) -> datetime:
-    reset_hour = AppConfig.get("daily_reset_hour_utc", 0)
-    buffer_seconds = AppConfig.get("next_deadline_buffer_seconds", -1)
-    logger.debug(f"Calculating deadline based on current valid streak event date: {action_date_event}")
-    base_day_start = datetime(
-        action_date_event.year, action_date_event.month, action_date_event.day,
-        reset_hour, 0, 0, tzinfo=timezone.utc
-    ) + timedelta(days=2) 
-    deadline = base_day_start + timedelta(seconds=buffer_seconds)
-    logger.debug(f"Deadline for action after {action_date_event}: {deadline}")
-    return deadline
+
+# ContentValidator is loaded on first use (see _ensure_validator_loaded), not at import time.
+_ai_init_lock = threading.Lock()
+
+def _ensure_validator_loaded() -> None:
+    """Loads the help_post model once; concurrent first callers wait on the lock. Re-raises load_model errors."""
+    if ContentValidator._model_pipeline is not None: return
+    with _ai_init_lock:
+        if ContentValidator._model_pipeline is None: ContentValidator.load_model()
+
+class StreakRecord:
+    """Stored streak state for one (user, action type); slotted, so no per-record __dict__."""
+    __slots__ = ("current_streak", "last_event_date", "status")
+
+    def __init__(self, current_streak: int = 0, last_event_date: Optional[DateObject] = None, status: str = "none"):
+        self.current_streak = current_streak; self.last_event_date = last_event_date; self.status = status
+
+    def __repr__(self) -> str:
+        return f"StreakRecord(current_streak={self.current_streak!r}, last_event_date={self.last_event_date!r}, status={self.status!r})"
+
+# Flat store keyed by (uid, action_type), plus each user's action types in first-seen order for loop 2.
+_streaks: Dict[Tuple[str, str], StreakRecord] = {}
+_user_types: Dict[str, List[str]] = {}
+
+class _StreakInfoRaw(NamedTuple):
+    """Field-for-field StreakInfo used while a request is processed; converted to pydantic once on return."""
+    current_streak: int
+    status: str
+    tier: str
+    next_deadline_utc: Optional[datetime]
+    validated: Optional[bool]
+    rejection_reason: Optional[str]
+    error_code: Optional[str]
+
+_ZERO_OFFSET = timedelta(0)
+
+def get_utc_date(dt: datetime) -> DateObject:
+    tz = dt.tzinfo
+    # Naive datetimes are taken as UTC; zero-offset zones (timezone.utc, pydantic's parsed 'Z') need no conversion.
+    if tz is None or tz is timezone.utc or dt.utcoffset() == _ZERO_OFFSET: return dt.date()
+    return dt.astimezone(timezone.utc).date()
+
+_TWO_DAYS = timedelta(days=2)
+
+@lru_cache(maxsize=4096) # Pure in all three arguments, so config changes simply produce new keys
+def _calc_deadline(action_date_event: DateObject, reset_hour: int, buffer_td: timedelta) -> datetime:
+    # Reset hour two days after the streak's event date, shifted by the configured buffer.
+    return datetime(action_date_event.year, action_date_event.month, action_date_event.day, reset_hour, 0, 0, tzinfo=timezone.utc) + _TWO_DAYS + buffer_td
+
+@lru_cache(maxsize=4096)
+def _calc_deadline_ts(action_date_event: DateObject, reset_hour: int, buffer_seconds: float) -> float:
+    # Same instant as _calc_deadline, as POSIX seconds for plain numeric comparisons.
+    return timegm((action_date_event.year, action_date_event.month, action_date_event.day, reset_hour, 0, 0)) + 2 * 86400 + buffer_seconds
+
+def _utc_timestamp(dt: datetime) -> float:
+    return (dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)).timestamp() # Naive datetimes are taken as UTC, as in get_utc_date
+
+# Tier thresholds (ascending) and names, rebuilt only when AppConfig hands back a different streak_tiers list.
+_TIERS_SOURCE: Optional[List[Dict[str, Any]]] = None
+_TIERS_CACHE: Tuple[Tuple[int, ...], Tuple[str, ...], str] = ((), (), "none")
+
+def _tier_table(tiers: List[Dict[str, Any]]) -> Tuple[Tuple[int, ...], Tuple[str, ...], str]:
+    global _TIERS_SOURCE, _TIERS_CACHE
+    if tiers is not _TIERS_SOURCE:
+        default_name = tiers[0]["name"] if tiers and isinstance(tiers[0], dict) and "name" in tiers[0] else "none"
+        # Stable descending sort then reverse: among equal thresholds the earliest-configured tier ends up last,
+        # which is the one bisect_right picks (same winner as the previous first-match scan).
+        ordered = list(reversed(sorted(tiers, key=lambda x: x.get("min_streak", 0), reverse=True)))
+        _TIERS_CACHE = (tuple(t.get("min_streak", 0) for t in ordered), tuple(t.get("name", "none") for t in ordered), default_name)
+        _TIERS_SOURCE = tiers
+    return _TIERS_CACHE
 
 def get_streak_tier_name(streak_len: int) -> str:
-    tiers = AppConfig.get("streak_tiers", [])
-    tier_name = tiers[0]["name"] if tiers and isinstance(tiers[0], dict) and "name" in tiers[0] else "none"
-    for td in sorted(tiers, key=lambda x: x.get("min_streak", 0), reverse=True):
-        if streak_len >= td.get("min_streak", 0):
-            tier_name = td.get("name", "none"); break
-    return tier_name
+    thresholds, names, default_name = _tier_table(AppConfig.get("streak_tiers", []))
+    i = bisect_right(thresholds, streak_len) - 1
+    return names[i] if i >= 0 else default_name
 
-class StreakCalculatorService:
-    def _validate_action_metadata(self, type: str, meta: Dict[str, Any], cfg: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
-        validators = cfg.get("validators", {})
-        if type == "quiz":
-            if validators.get("min_score") is not None and meta.get("score", -1) < validators["min_score"]:
-                return False, f"Quiz score {meta.get('score', 'N/A')} below min {validators['min_score']}."
-            if validators.get("max_time_taken_sec") is not None and meta.get("time_taken_sec", float('inf')) > validators["max_time_taken_sec"]:
-                return False, f"Quiz time {meta.get('time_taken_sec', 'N/A')}s exceeds max."
-        elif type == "help_post":
-            if validators.get("min_word_count") is not None and meta.get("word_count", 0) < validators["min_word_count"]:
-                return False, f"Help post word count {meta.get('word_count',0)} below min {validators['min_word_count']}."
-        return True, None
+# Metadata validators are built per action type with their config thresholds bound, so the per-action call
+# does no config lookups. Each returns (is_valid, rejection_reason, error_code).
+_Verdict = Tuple[bool, Optional[str], Optional[str]]
+_MetaValidator = Callable[[Dict[str, Any]], _Verdict]
+
+def _always_valid(meta: Dict[str, Any]) -> _Verdict:
+    return True, None, None
+
+def _canonical_validators(validators: Dict[str, Any]) -> Dict[str, Any]:
+    """Every known validator key present (None / False when not configured), so factories can subscript."""
+    return {"min_score": validators.get("min_score"), "max_time_taken_sec": validators.get("max_time_taken_sec"),
+            "min_word_count": validators.get("min_word_count"), "ai_validation_enabled": bool(validators.get("ai_validation_enabled", False))}
+
+def _quiz_validator(validators: Dict[str, Any]) -> _MetaValidator:
+    min_score = validators["min_score"]; max_time = validators["max_time_taken_sec"]
+    def validate(meta: Dict[str, Any]) -> _Verdict:
+        if min_score is not None and meta.get("score", -1) < min_score:
+            return False, f"Quiz score {meta.get('score', 'N/A')} below min {min_score}.", "quiz_score_too_low"
+        if max_time is not None and meta.get("time_taken_sec", float('inf')) > max_time:
+            return False, f"Quiz time {meta.get('time_taken_sec', 'N/A')}s exceeds max.", "quiz_time_exceeded"
+        return True, None, None
+    return validate
+
+def _help_post_validator(validators: Dict[str, Any]) -> _MetaValidator:
+    min_words = validators["min_word_count"]
+    if min_words is None: return _always_valid
+    def validate(meta: Dict[str, Any]) -> _Verdict:
+        if meta.get("word_count", 0) < min_words:
+            return False, f"Help post word count {meta.get('word_count',0)} below min {min_words}.", "word_count_too_low"
+        return True, None, None
+    return validate
+
+# Validator factories per action type; types without an entry (e.g. login) have nothing to validate.
+_ACTION_VALIDATORS: Dict[str, Callable[[Dict[str, Any]], _MetaValidator]] = {"quiz": _quiz_validator, "help_post": _help_post_validator}
 
+class _ActionPlan(NamedTuple):
+    """Everything loop 1 needs from an enabled action type's config, resolved once per config object."""
+    validate: _MetaValidator
+    ai_validation: bool
+
+# Per-user serialization without one global lock: requests run on threadpool workers (and may run truly
+# in parallel on free-threaded builds), so concurrent updates for the same user must not interleave.
+_LOCK_SHARDS = tuple(threading.Lock() for _ in range(64))
+
+def _lock_for(uid: str) -> threading.Lock:
+    return _LOCK_SHARDS[hash(uid) & 63]
+
+_PLANS_SOURCE: Optional[Dict[str, Any]] = None
+_PLANS: Dict[str, _ActionPlan] = {}
+
+def _action_plans(activity_types: Dict[str, Any]) -> Dict[str, _ActionPlan]:
+    """Plans for the enabled action types; rebuilt only when AppConfig hands back a different activity_types dict."""
+    global _PLANS_SOURCE, _PLANS
+    if activity_types is not _PLANS_SOURCE:
+        plans = {}
+        for act_type, act_cfg in activity_types.items():
+            if not act_cfg or not act_cfg.get("enabled"): continue
+            validators = _canonical_validators(act_cfg.get("validators") or {})
+            factory = _ACTION_VALIDATORS.get(act_type)
+            plans[act_type] = _ActionPlan(factory(validators) if factory else _always_valid, act_type == "help_post" and validators["ai_validation_enabled"])
+        _PLANS, _PLANS_SOURCE = plans, activity_types
+    return _PLANS
+
+class StreakCalculatorService:
     def process_user_actions(self, uid: str, event_dt_utc: datetime, actions_load: List[Dict[str, Any]]) -> Dict[str, StreakInfo]:
-        logger.info(f"Processing for user '{uid}', event_dt: {event_dt_utc}")
-        if uid not in user_streaks_db: user_streaks_db[uid] = {}
-        
-        user_data = user_streaks_db[uid]
-        processed_payload_info: Dict[str, StreakInfo] = {}
+        logger.info("Processing for user '%s', event_dt: %s", uid, event_dt_utc)
+        final_output: Dict[str, _StreakInfoRaw] = {}
         current_event_dt_date = get_utc_date(event_dt_utc)
-        
-        processed_types_in_req = set()
 
-        # Loop 1: Process actions present in the current request's payload
+        # Config is read once per request; the loops below only touch locals.
+        grace_seconds = AppConfig.get("grace_period_hours", 0) * 3600
+        reset_hour = AppConfig.get("daily_reset_hour_utc", 0)
+        buffer_seconds = AppConfig.get("next_deadline_buffer_seconds", -1)
+        buffer_td = timedelta(seconds=buffer_seconds)
+        # Deadline checks compare epoch seconds; datetimes are only built for next_deadline_utc in the response.
+        event_ts = _utc_timestamp(event_dt_utc)
+        plans = _action_plans(AppConfig.get("activity_types", {}) or {})
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        # Drop unknown/disabled action types and validate the rest up front. Validation (including AI inference)
+        # depends only on the payload, so it runs before taking the user's lock.
+        scored_actions: List[Tuple[str, bool, Optional[str], Optional[str]]] = []
         for item in actions_load:
             act_type = item.get("type")
+            plan = plans.get(act_type) if isinstance(act_type, str) else None
+            if not plan: logger.warning("Action '%s' not configured/enabled. Skipping.", act_type); continue
             meta = item.get("metadata", {})
-            processed_types_in_req.add(act_type)
-            act_cfg = AppConfig.get(f"activity_types.{act_type}")
-
-            if not act_cfg or not act_cfg.get("enabled"):
-                logger.warning(f"Action '{act_type}' not configured/enabled. Skipping."); continue
-
-            last_info = user_data.get(act_type, {})
-            streak_db = last_info.get("current_streak", 0)
-            last_event_d = last_info.get("last_event_date", None)
-            status_db = last_info.get("status", "none")
-
-            logger.debug(f"[{act_type}] DB Before: S={streak_db}, Date={last_event_d}, Status={status_db}")
-
-            is_valid, reason = self._validate_action_metadata(act_type, meta, act_cfg)
-            logger.debug(f"[{act_type}] Initial validation: {is_valid}, Reason: {reason}")
-            if is_valid and act_type == "help_post" and act_cfg.get("validators", {}).get("ai_validation_enabled"):
-                logger.debug(f"[{act_type}] Starting AI validation")
-                if ContentValidator._model_pipeline is None:
-                    try: 
-                        ContentValidator.load_model()
-                        logger.debug(f"[{act_type}] AI model loaded successfully")
-                    except Exception as e: 
-                        logger.error(f"[{act_type}] AI model load failed: {e}")
-                        is_valid, reason = False, f"AI model load fail: {e}"
+            is_valid, reason, error_code = plan.validate(meta)
+            if is_valid and plan.ai_validation:
+                try: _ensure_validator_loaded()
+                except Exception as e: 
+                    logger.error("[%s] AI model load failed: %s", act_type, e)
+                    is_valid, reason, error_code = False, f"AI model load fail: {e}", "ai_unavailable"
                 if ContentValidator._model_pipeline: 
-                    logger.debug(f"[{act_type}] Running AI validation on content: {meta.get('content', '')[:100]}...")
-                    is_valid, reason, _ = ContentValidator.validate_content(meta.get("content", ""))
-                    logger.debug(f"[{act_type}] AI validation result: {is_valid}, Reason: {reason}")
-                    if not is_valid:
-                        logger.debug(f"[{act_type}] AI validation failed: {reason}")
-            
-            logger.debug(f"[{act_type}] Final validation: {is_valid}, Reason: {reason}")
-
-            out_streak = streak_db
-            out_status = "active" if status_db == "none" else status_db 
-            date_counts_for = current_event_dt_date
-
-            if not is_valid:
-                logger.debug(f"[{act_type}] Action not valid. Current state: streak={streak_db}, status={status_db}, last_date={last_event_d}")
-                if last_event_d and streak_db > 0: 
-                    eff_dl_old = calculate_strict_deadline_for_next_day_action(last_event_d) + timedelta(hours=AppConfig.get("grace_period_hours",0))
-                    if event_dt_utc > eff_dl_old: out_streak, out_status, date_counts_for = 0, "lost", None
-                    else: out_status, date_counts_for = "active", last_event_d 
-                else: out_streak, out_status, date_counts_for = 0, "none", None 
-            else: # IS VALID
-                logger.debug(f"[{act_type}] Action is valid. Current state: streak={streak_db}, status={status_db}, last_date={last_event_d}")
-                out_status = "active" 
-                if last_event_d is None: 
-                    out_streak = 1; date_counts_for = current_event_dt_date
-                    logger.debug(f"[{act_type}] First valid action. S=1, St=active, Date={date_counts_for}")
-                elif current_event_dt_date == last_event_d: 
-                    date_counts_for = last_event_d
-                    logger.debug(f"[{act_type}] Same day valid action. S={out_streak}, St=active, Date={date_counts_for}")
-                else:
-                    expected_continue_day = last_event_d + timedelta(days=1)
-                    eff_dl_expected = calculate_strict_deadline_for_next_day_action(last_event_d) + timedelta(hours=AppConfig.get("grace_period_hours",0))
-                    if uid == FAILING_TEST_USER_ID_FOR_LOGGING and act_type == 'login': 
-                        logger.info(f"DEBUG_GRACE_VALID [{act_type} for {uid}]: event_dt_utc={event_dt_utc.isoformat()}, eff_dl_expected={eff_dl_expected.isoformat()}, condition={event_dt_utc <= eff_dl_expected}")
-                    if event_dt_utc <= eff_dl_expected:
-                        out_streak = streak_db + 1; date_counts_for = expected_continue_day
-                        logger.debug(f"[{act_type}] Streak continued. S={out_streak}, St=active, Date={date_counts_for}")
-                    else: 
-                        out_streak = 1; date_counts_for = current_event_dt_date
-                        logger.info(f"[{act_type}] Streak broken, new started. S=1, St=active, Date={date_counts_for}")
-            
-            # Ensure last_event_date is always set for valid actions
-            if out_status == "active" and date_counts_for is None:
-                date_counts_for = current_event_dt_date  # Defensive: should never be None for valid actions
-            user_data[act_type] = {"current_streak": out_streak, "last_event_date": date_counts_for if out_status not in ["lost", "none"] else None, "status": out_status}
-            if uid == FAILING_TEST_USER_ID_FOR_LOGGING and act_type == "help_post": logger.info(f"SPECIAL_LOG [{act_type} for {uid}]: Loop 1 DB Update: {user_data[act_type]}")
-
-            next_dl = None
-            if out_status == "active" and out_streak > 0 and date_counts_for: next_dl = calculate_strict_deadline_for_next_day_action(date_counts_for)
-            processed_payload_info[act_type] = StreakInfo(current_streak=out_streak, status=out_status, tier=get_streak_tier_name(out_streak), next_deadline_utc=next_dl, validated=is_valid, rejection_reason=reason if not is_valid else None)
-
-        # DEBUG: Print user_data after first loop
-        logger.info(f"DEBUG: user_data after first loop for user '{uid}': {user_data}")
-
-        # Loop 2: Construct the final response object
-        final_output: Dict[str, StreakInfo] = {}
-        for act_type_out in user_data.keys():
-            db_state = user_data[act_type_out]
-            s = db_state.get("current_streak",0); st = db_state.get("status","none"); d = db_state.get("last_event_date",None)
-            n_dl, val, rej = None, None, None
-
-            if payload_info := processed_payload_info.get(act_type_out): 
-                val, rej = payload_info.validated, payload_info.rejection_reason
-            elif d and s > 0 and st == "active": 
-                eff_dl = calculate_strict_deadline_for_next_day_action(d) + timedelta(hours=AppConfig.get("grace_period_hours",0))
-                if event_dt_utc > eff_dl: 
-                    s_new, st_new, d_new = 0, "lost", None 
-                    user_data[act_type_out] = {"current_streak":s_new, "status":st_new, "last_event_date":d_new} 
-                    s, st, d = s_new, st_new, d_new 
-                # else: n_dl will be calculated based on existing 'd' if still active
-            elif s == 0 and st != "lost" and act_type_out not in processed_types_in_req: 
-                st = "lost" if d else "none"; user_data[act_type_out]["status"] = st 
-            
-            current_final_streak = user_data[act_type_out]["current_streak"]
-            current_final_status = user_data[act_type_out]["status"]
-            current_final_last_date = user_data[act_type_out]["last_event_date"]
-
-            if current_final_status == "active" and current_final_streak > 0 and current_final_last_date:
-                n_dl = calculate_strict_deadline_for_next_day_action(current_final_last_date)
-            else: 
-                n_dl = None
-
-            final_output[act_type_out] = StreakInfo(
-                current_streak=current_final_streak, 
-                status=current_final_status,       
-                tier=get_streak_tier_name(current_final_streak),
-                next_deadline_utc=n_dl,
-                validated=val, 
-                rejection_reason=rej 
-            )
-            if uid == FAILING_TEST_USER_ID_FOR_LOGGING and act_type_out == "help_post": 
-                logger.info(f"SPECIAL_LOG [{act_type_out} for {uid}]: Final Output Entry: {final_output[act_type_out].model_dump_json(indent=2)}")
-        
-        logger.info(f"Final response for user '{uid}': {final_output}")
-        return final_output
\ No newline at end of file
+                    is_valid, reason, _, error_code = ContentValidator.validate_content(meta.get("content", ""))
+            scored_actions.append((act_type, is_valid, reason, error_code))
+
+        with _lock_for(uid): # Read-modify-write of this user's records; other users in other shards proceed in parallel
+            user_types = _user_types.setdefault(uid, [])
+            # Loop 1: Process actions present in the current request's payload
+            for act_type, is_valid, reason, error_code in scored_actions:
+                key = (uid, act_type)
+                rec = _streaks.get(key)
+                if rec is None: streak_db, last_event_d, status_db = 0, None, "none"; user_types.append(act_type) # Every path below stores a record
+                else: streak_db, last_event_d, status_db = rec.current_streak, rec.last_event_date, rec.status
+
+                if is_valid and last_event_d is None: # First valid action for this type (the common new-user case): no deadline checks needed
+                    _streaks[key] = StreakRecord(1, current_event_dt_date, "active")
+                    final_output[act_type] = _StreakInfoRaw(1, "active", get_streak_tier_name(1), _calc_deadline(current_event_dt_date, reset_hour, buffer_td), True, None, None)
+                    if debug_enabled: logger.debug("[%s] before: S=%s Date=None St=%s | valid=True (first valid action) | after: %s", act_type, streak_db, status_db, _streaks[key])
+                    continue
+
+                out_streak = streak_db
+                out_status = "active" if status_db == "none" else status_db 
+                date_counts_for = current_event_dt_date
+
+                if not is_valid:
+                    if last_event_d and streak_db > 0: 
+                        eff_dl_old = _calc_deadline_ts(last_event_d, reset_hour, buffer_seconds) + grace_seconds
+                        if event_ts > eff_dl_old: out_streak, out_status, date_counts_for = 0, "lost", None
+                        else: out_status, date_counts_for = "active", last_event_d 
+                    else: out_streak, out_status, date_counts_for = 0, "none", None 
+                else: # IS VALID
+                    out_status = "active" 
+                    if current_event_dt_date == last_event_d: 
+                        date_counts_for = last_event_d
+                    else:
+                        expected_continue_day = last_event_d + timedelta(days=1)
+                        eff_dl_expected = _calc_deadline_ts(last_event_d, reset_hour, buffer_seconds) + grace_seconds
+                        if event_ts <= eff_dl_expected:
+                            out_streak = streak_db + 1; date_counts_for = expected_continue_day
+                        else: 
+                            out_streak = 1; date_counts_for = current_event_dt_date
+                            logger.info("[%s] Streak broken, new started. S=1, St=active, Date=%s", act_type, date_counts_for)
+
+                # Ensure last_event_date is always set for valid actions
+                if out_status == "active" and date_counts_for is None:
+                    date_counts_for = current_event_dt_date  # Defensive: should never be None for valid actions
+                _streaks[key] = StreakRecord(out_streak, date_counts_for if out_status not in ("lost", "none") else None, out_status)
+                if debug_enabled: logger.debug("[%s] before: S=%s Date=%s St=%s | valid=%s reason=%s | after: %s", act_type, streak_db, last_event_d, status_db, is_valid, reason, _streaks[key])
+
+                next_dl = None
+                if out_status == "active" and out_streak > 0 and date_counts_for: next_dl = _calc_deadline(date_counts_for, reset_hour, buffer_td)
+                final_output[act_type] = _StreakInfoRaw(out_streak, out_status, get_streak_tier_name(out_streak), next_dl, is_valid, reason if not is_valid else None, error_code if not is_valid else None)
+
+            # Loop 2: Report (and time out) the user's streaks that were not in this payload; loop 1 already built the rest.
+            for act_type_out in user_types:
+                if act_type_out in final_output: continue
+                rec = _streaks[(uid, act_type_out)]
+                s, st, d = rec.current_streak, rec.status, rec.last_event_date
+
+                if d and s > 0 and st == "active": 
+                    eff_dl = _calc_deadline_ts(d, reset_hour, buffer_seconds) + grace_seconds
+                    if event_ts > eff_dl: 
+                        s_new, st_new, d_new = 0, "lost", None 
+                        _streaks[(uid, act_type_out)] = rec = StreakRecord(s_new, d_new, st_new)
+                        s, st, d = s_new, st_new, d_new 
+                    # else: n_dl will be calculated based on existing 'd' if still active
+                elif s == 0 and st != "lost": 
+                    st = "lost" if d else "none"; rec.status = st
+
+                current_final_streak, current_final_status, current_final_last_date = rec.current_streak, rec.status, rec.last_event_date
+
+                if current_final_status == "active" and current_final_streak > 0 and current_final_last_date:
+                    n_dl = _calc_deadline(current_final_last_date, reset_hour, buffer_td)
+                else: 
+                    n_dl = None
+
+                final_output[act_type_out] = _StreakInfoRaw(current_final_streak, current_final_status, get_streak_tier_name(current_final_streak), n_dl, None, None, None)
+
+            # Report in the user's first-seen type order (user_types covers every key in final_output), not payload order.
+            ordered = [(act, final_output[act]) for act in user_types]
+
+        logger.info("Final response for user '%s': %s", uid, final_output)
+        # Values are built above with the right types, so skip re-validation at the API boundary.
+        return {act: StreakInfo.model_construct(**raw._asdict()) for act, raw in ordered}
\ No newline at end of file
@@ -0,0 +1,80 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+import os
+import logging
+from unittest.mock import patch
+
+# Try to import app and config
+try:
+    from app.main import app # Your FastAPI application
+    from app.core.config import AppConfig 
+    from app.ai.validator import ContentValidator
+except ImportError:
+    # Fallback if pytest has issues with relative paths from test dir
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from app.main import app
+    from app.core.config import AppConfig
+    from app.ai.validator import ContentValidator
+
+BASE_URL = "http://127.0.0.1" # Base URL for the client
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "real_ai: run the help_post classifier instead of the mocked validate_content")
+    # Per-request framework/client logging is noise in test output
+    for name in ("uvicorn", "uvicorn.access", "fastapi", "multipart.multipart", "httpx"):
+        logging.getLogger(name).disabled = True
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    # Required for async pytest functions; session scope also lets the client below be session-scoped
+    return "asyncio"
+
+@pytest.fixture(scope="session")
+async def client(anyio_backend):
+    # Config, model and app lifespan are set up once for the whole run; tests use distinct user ids, so they don't share streak state
+    AppConfig._config_data = {} 
+    AppConfig._loaded = False   
+    try:
+        AppConfig.load_config() 
+    except Exception as e:
+        print(f"WARNING: Failed to load AppConfig in test client fixture: {e}")
+
+    # Initialize ContentValidator
+    try:
+        ContentValidator.load_model()
+        print("ContentValidator initialized successfully in test client fixture")
+    except Exception as e:
+        print(f"WARNING: Failed to initialize ContentValidator in test client fixture: {e}")
+
+    # Using app.router.lifespan_context ensures startup/shutdown events run for tests
+    app.openapi() # Build and cache the OpenAPI schema once rather than on the first request that needs it
+    async with app.router.lifespan_context(app): 
+        transport = ASGITransport(app=app) # Pass the FastAPI app instance here
+        async with AsyncClient(transport=transport, base_url=BASE_URL) as ac:
+            yield ac
+
+@pytest.fixture(scope="session")
+def cfg() -> dict:
+    # Config values the tests assert against, read once; nothing in the suite changes AppConfig mid-run
+    return {
+        "grace_hours": AppConfig.get("grace_period_hours", 2),
+        "tiers": AppConfig.get("streak_tiers"),
+        "reset_hour": AppConfig.get("daily_reset_hour_utc", 0),
+        "buffer": AppConfig.get("next_deadline_buffer_seconds", -1),
+        "service_version": AppConfig.get("service_version", "N/A - Test Default"),
+    }
+
+@pytest.fixture(scope="session")
+def tier_lookup(cfg: dict) -> list:
+    # (min_streak, name) pairs, highest threshold first; keyed sort keeps config order for equal thresholds
+    return sorted(((t["min_streak"], t["name"]) for t in cfg["tiers"]), key=lambda p: p[0], reverse=True)
+
+@pytest.fixture(autouse=True)
+def mock_ai(request):
+    # Streak bookkeeping tests don't need model inference; tests marked real_ai exercise the actual classifier
+    if request.node.get_closest_marker("real_ai"):
+        yield
+        return
+    with patch.object(ContentValidator, 'validate_content', return_value=(True, 'Mocked valid', 1.0, None)):
+        yield
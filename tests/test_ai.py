@@ -0,0 +1,72 @@
+import os
+import re
+import sys
+import pytest
+import pandas as pd
+
+from app.core.config import AppConfig
+from app.ai.validator import ContentValidator
+from app.ai._preproc import common_preprocess_text, common_preprocess_batch, get_english_stopwords
+from app.ai import trainer
+
+# The trained model was fit on the output of the original regex-based preprocessing; the translate/batch
+# rewrites and the int16 scoring path must reproduce it exactly (predictions) or within rounding (probabilities).
+TRAINING_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'help_post_training_data.csv')
+
+def _reference_preprocess(text) -> str:
+    # Preprocessing as originally shipped with the v1.0.0 model
+    if not isinstance(text, str): return ""
+    text = re.sub(r'[^\w\s\.\(\)\+\-\*/\=\<\>\%]', '', text.lower())
+    return " ".join(w for w in text.split() if w not in get_english_stopwords())
+
+SAMPLES = [
+    "How do I fix a NameError in Python? I tried x = y + 1 (y undefined).",
+    "Ça marche — naïve café, ½ cup, x² ≥ 3, ٣ apples, 日本語のテキスト, emoji 🚀🔥!",
+    "İstanbul ǅemal ß ﬁnance Ⅻ é  em space​zero-width",
+    "row\x1eseparator\x1e\x1einside one text",
+    "tabs\tand\nnewlines\r\nand \x1c\x1d\x1f control separators",
+    "", "   ", "the and of a", # Empty or stopwords only
+    None, 42, 3.5, b"bytes are not str",
+]
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_preprocess_text_matches_regex_reference(text):
+    assert common_preprocess_text(text) == _reference_preprocess(text)
+
+def test_preprocess_text_matches_regex_reference_for_every_code_point():
+    # Each code point on its own, space separated, so every character is cleaned (or kept) independently
+    chars = [chr(cp) for cp in range(sys.maxunicode + 1) if not 0xD800 <= cp <= 0xDFFF]
+    text = " ".join(chars)
+    if common_preprocess_text(text) != _reference_preprocess(text): # Name the offending code point instead of diffing a ~2MB string
+        bad = next(c for c in chars if common_preprocess_text(c) != _reference_preprocess(c))
+        pytest.fail(f"U+{ord(bad):04X} {bad!r}: {common_preprocess_text(bad)!r} != {_reference_preprocess(bad)!r}")
+
+def test_preprocess_batch_matches_per_row():
+    rows = SAMPLES + pd.read_csv(TRAINING_CSV)['content'].astype(str).tolist()
+    assert common_preprocess_batch(rows) == [common_preprocess_text(r) for r in rows]
+    assert common_preprocess_batch([]) == []
+
+def test_preprocess_series_parallel_matches_serial(monkeypatch):
+    # The joblib path only kicks in for huge corpora; lower the threshold so the bundled CSV goes through it
+    monkeypatch.setattr(trainer, "_PARALLEL_MIN_ROWS", 2)
+    s = pd.read_csv(TRAINING_CSV)['content'].astype(str)
+    s = s.set_axis(s.index[::-1] * 7) # Non-default, descending index: chunks must come back in order, labels intact
+    result = trainer.common_preprocess_series(s, n_jobs=2)
+    assert result.equals(trainer._preprocess_batch(s))
+    assert result.index.equals(s.index)
+
+@pytest.fixture(scope="module")
+def model():
+    AppConfig.load_config(); ContentValidator.load_model()
+    return ContentValidator
+
+def test_predict_matches_pipeline(model):
+    texts = common_preprocess_batch(pd.read_csv(TRAINING_CSV)['content'].astype(str).tolist())
+    assert model._coef is not None # The bundled model is a binary linear classifier, so the int16 sparse-dot path is the one under test
+    pipeline = model._model_pipeline
+    expected_classes = pipeline.predict(texts)
+    expected_probs = pipeline.predict_proba(texts)[:, model._class_1_index]
+    for text, expected_class, expected_prob in zip(texts, expected_classes, expected_probs):
+        predicted_class, prob = model._predict(text)
+        assert predicted_class == expected_class, text
+        assert prob == pytest.approx(expected_prob, abs=1e-4), text # int16 coefficients; see _quantize_coef